@@ -142,6 +142,22 @@ class ESN
    */
   void teacherForce(const DEMatrix &in, DEMatrix &out);
 
+  /*!
+   * Simulation with Teacher Forcing, which records the free-running
+   * network output of every timestep while the teacher signal is
+   * forced into the feedback.
+   * This does the same as calling simulateStep() and setLastOutput()
+   * for every timestep, but performs the whole loop at once.
+   *
+   * @param in matrix of input values (inputs x timesteps)
+   * @param teach matrix of teacher values (outputs x timesteps),
+   *              forced into the feedback
+   * @param out matrix for the calculated output values
+   *            (outputs x timesteps)
+   */
+  void simulateWithTeacherForcing(const DEMatrix &in, const DEMatrix &teach,
+                                  DEMatrix &out) throw(AUExcept);
+
   /*!
    * Collect network/reservoir states and return the whole
    * state matrix over time.
@@ -236,6 +252,23 @@ class ESN
   void teacherForce(T *inmtx, int inrows, int incols,
                        T *outmtx, int outrows, int outcols) throw(AUExcept);
 
+  /*!
+   * Simulation with Teacher Forcing, which records the free-running
+   * network output of every timestep while the teacher signal is
+   * forced into the feedback.
+   * (data will be copied into a FLENS matrix)
+   *
+   * @param inmtx input matrix in row major storage (inputs x timesteps)
+   * @param teachmtx teacher matrix in row major storage
+   *                 (outputs x timesteps), forced into the feedback
+   * @param outmtx output matrix in row major storage (outputs x timesteps),
+   *               \attention Data must be already allocated!
+   */
+  void simulateWithTeacherForcing(T *inmtx, int inrows, int incols,
+                                  T *teachmtx, int teachrows, int teachcols,
+                                  T *outmtx, int outrows, int outcols)
+    throw(AUExcept);
+
   /*!
    * Collect network/reservoir states and return the whole
    * state matrix over time.
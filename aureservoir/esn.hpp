@@ -273,6 +273,32 @@ void ESN<T>::teacherForce(const DEMatrix &in, DEMatrix &out)
   }
 }
 
+template <typename T>
+void ESN<T>::simulateWithTeacherForcing(const DEMatrix &in,
+                                        const DEMatrix &teach, DEMatrix &out)
+  throw(AUExcept)
+{
+  if( teach.numCols() != in.numCols() || out.numCols() != in.numCols() )
+    throw AUExcept("ESN::simulateWithTeacherForcing: teacher, output and input must have same nr of columns!");
+  if( in.numRows() != inputs_ )
+    throw AUExcept("ESN::simulateWithTeacherForcing: wrong input row size!");
+  if( teach.numRows() != outputs_ || out.numRows() != outputs_ )
+    throw AUExcept("ESN::simulateWithTeacherForcing: wrong output row size!");
+
+  int steps = in.numCols();
+
+  DEMatrix sim_in(inputs_ ,1), sim_out(outputs_ ,1);
+  // simulate all steps, recording the output and forcing the teacher
+  // signal into the feedback
+  for(int n=1; n<=steps; ++n)
+  {
+    sim_in(_,1) = in(_,n);
+    simulate(sim_in, sim_out);
+    out(_,n) = sim_out(_,1);
+    sim_->last_out_(_,1) = teach(_,n);
+  }
+}
+
 template <typename T>
 void ESN<T>::collectStates(const DEMatrix &in, DEMatrix &X, int washout)
   throw(AUExcept)
@@ -416,6 +442,36 @@ void ESN<T>::teacherForce(T *inmtx, int inrows, int incols,
   teacherForce(flin, flout);
 }
 
+template <typename T>
+void ESN<T>::simulateWithTeacherForcing(T *inmtx, int inrows, int incols,
+                                        T *teachmtx, int teachrows,
+                                        int teachcols, T *outmtx,
+                                        int outrows, int outcols)
+  throw(AUExcept)
+{
+  DEMatrix flin(inrows,incols);
+  DEMatrix flteach(teachrows,teachcols);
+  DEMatrix flout(outrows,outcols);
+
+  // copy data to FLENS matrix (column major storage)
+  for(int i=0; i<inrows; ++i) {
+  for(int j=0; j<incols; ++j) {
+    flin(i+1,j+1) = inmtx[i*incols+j];
+  } }
+  for(int i=0; i<teachrows; ++i) {
+  for(int j=0; j<teachcols; ++j) {
+    flteach(i+1,j+1) = teachmtx[i*teachcols+j];
+  } }
+
+  simulateWithTeacherForcing(flin, flteach, flout);
+
+  // copy data to output
+  for(int i=0; i<outrows; ++i) {
+  for(int j=0; j<outcols; ++j) {
+    outmtx[i*outcols+j] = flout(i+1,j+1);
+  } }
+}
+
 template <typename T>
 void ESN<T>::collectStates(T *inmtx, int inrows, int incols,
                            T *outmtx, int outrows, int outcols,
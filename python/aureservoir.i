@@ -80,6 +80,7 @@ import_array();
 %apply (float *INPLACE_ARRAY2, int DIM1, int DIM2)
 {  (float *inmtx, int inrows, int incols),
    (float *outmtx, int outrows, int outcols),
+   (float *teachmtx, int teachrows, int teachcols),
    (float *wmtx, int wrows, int wcols), 
    (float *amtx, int arows, int acols),
    (float *bmtx, int brows, int bcols) };
@@ -87,6 +88,7 @@ import_array();
 %apply (double *INPLACE_ARRAY2, int DIM1, int DIM2)
 {  (double *inmtx, int inrows, int incols),
    (double *outmtx, int outrows, int outcols),
+   (double *teachmtx, int teachrows, int teachcols),
    (double *wmtx, int wrows, int wcols),
    (double *amtx, int arows, int acols),
    (double *bmtx, int brows, int bcols) };
@@ -154,6 +156,9 @@ class ESN
   inline void simulateStep(T *invec, int insize, T *outvec, int outsize);
   void teacherForce(T *inmtx, int inrows, int incols,
                     T *outmtx, int outrows, int outcols);
+  void simulateWithTeacherForcing(T *inmtx, int inrows, int incols,
+                                  T *teachmtx, int teachrows, int teachcols,
+                                  T *outmtx, int outrows, int outcols);
   void collectStates(T *inmtx, int inrows, int incols,
                      T *outmtx, int outrows, int outcols,
                      int washout);
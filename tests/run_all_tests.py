@@ -1,5 +1,11 @@
 #!/usr/bin/python
 
+# runs all test_*.py modules in one serial unittest suite
+# the test classes are independent of each other, so modules already
+# ported to a current python (so far test_train.py) can also be run
+# on all cores with pytest-xdist:
+#   pytest -n auto test_train.py
+
 import unittest
 import glob
 all_tests = glob.glob( 'test_*.py' )